@@ -6,18 +6,28 @@
 
 from .main import (
     video_to_audio,
+    video_to_audio_batch,
     concatenate_videos,
     trim_video,
+    trim_video_batch,
     resize_video,
-    extract_frames
+    extract_frames,
+    get_video_info,
+    pipeline,
+    process_batch
 )
 
 __all__ = [
     "video_to_audio",
+    "video_to_audio_batch",
     "concatenate_videos",
     "trim_video",
+    "trim_video_batch",
     "resize_video",
-    "extract_frames"
+    "extract_frames",
+    "get_video_info",
+    "pipeline",
+    "process_batch"
 ]
 
 __version__ = "0.3.0"
@@ -7,237 +7,1390 @@
 - 写入 data/outputs/
 - 返回业务结果（不包含文件路径）
 """
+import asyncio
+import contextlib
+import functools
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
-from moviepy import VideoFileClip, concatenate_videoclips, ImageClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.tools import ffmpeg_escape_filename
+from moviepy.video.io.ffmpeg_reader import FFmpegInfosParser
 
 # 固定路径约定
 # v3.0: 文件组按 manifest 中的 key 组织（这里是 "input"）
 DATA_INPUTS = Path("data/inputs/input")
 DATA_OUTPUTS = Path("data/outputs")
 
+# 输出目录在导入时创建一次，而不是每次调用都 mkdir；
+# 之后被外部删除时，由写入失败的路径调用 _ensure_output_dir 重新创建
+try:
+    DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
+except OSError:
+    pass
+
+# 音频格式 -> (ffmpeg 编码器, 可直接流复制的源音频编码)
+AUDIO_CODECS = {
+    "mp3": ("libmp3lame", "mp3"),
+    "aac": ("aac", "aac"),
+    "m4a": ("aac", "aac"),
+    "flac": ("flac", "flac"),
+    "opus": ("libopus", "opus"),
+    "ogg": ("libvorbis", "vorbis"),
+    "wav": ("pcm_s16le", "pcm_s16le"),
+}
+
+# 无损编码器不接受比特率参数
+LOSSLESS_AUDIO_CODECS = {"flac", "pcm_s16le"}
+
+# libx264 默认 preset（medium 编码过慢，faster 画质损失几乎不可见）
+DEFAULT_PRESET = "faster"
+
+# 将 moov atom 放到文件开头，便于流式读取和快速定位
+FASTSTART_PARAMS = ["-movflags", "+faststart"]
+
+# 低延迟编码参数：关闭 B 帧和前瞻、按 slice 多线程、短 GOP，
+# 首帧输出更快，代价是压缩率下降约 5-10%
+X264_LOW_LATENCY_PARAMS = [
+    "-preset", "ultrafast",
+    "-x264-params", "sliced-threads=1:sync-lookahead=0:rc-lookahead=0:bframes=0",
+    "-g", "15"
+]
+
+# hwaccel 参数的取值：auto 自动使用可用的硬件编解码，none 始终使用 CPU（libx264）
+HWACCEL_MODES = ("auto", "none")
+
+# 可直接替换 libx264 的硬件 H.264 编码器（按优先级排列）
+# VAAPI 需要额外的 hwupload 滤镜，不能直接替换编码器，因此不在此列
+HW_ENCODERS = ["h264_nvenc", "h264_qsv", "h264_videotoolbox"]
+
+# 硬件编码器的码率控制：固定质量，画质与 libx264 默认的 CRF 23 相近。
+# 不设置时 ffmpeg 按固定码率编码（NVENC 约 2 Mb/s、QSV 约 1 Mb/s），与分辨率无关，
+# 高分辨率输出画质明显下降。检测编码器时带上这些参数，不支持的设备（如 Intel Mac
+# 上 videotoolbox 不支持 -q:v）会回退到 libx264
+HW_QUALITY_PARAMS = {
+    "h264_nvenc": ["-rc", "vbr", "-cq", "23", "-b:v", "0"],
+    "h264_qsv": ["-global_quality", "23"],
+    "h264_videotoolbox": ["-q:v", "65"],
+}
+
+# 硬件编码器 -> (硬件解码参数, 硬件缩放滤镜)
+# 解码输出、缩放滤镜和编码器必须使用同一种硬件帧格式，帧才能全程留在显存中，不必往返内存
+HW_PIPELINES = {
+    "h264_nvenc": (["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"], "scale_cuda"),
+    "h264_qsv": (["-hwaccel", "qsv", "-hwaccel_output_format", "qsv"], "scale_qsv"),
+}
+
+# 硬件编码器 -> 提帧用的硬件解码参数
+# 不指定 -hwaccel_output_format，解码后的帧自动下载到内存，供 select 滤镜和图片编码器使用
+HW_FRAME_DECODERS = {
+    "h264_nvenc": ["-hwaccel", "cuda"],
+    "h264_qsv": ["-hwaccel", "qsv"],
+}
+
+# 图片格式 -> ffmpeg 图片编码参数
+# ffmpeg 的 mjpeg 默认按码率编码，单帧画质很差，需显式指定质量（2 约相当于 quality 90）；
+# PNG 使用最低压缩级别，编码明显更快（720p 提帧整体快约 30%），文件约大 15%
+FRAME_ENCODE_PARAMS = {
+    "jpg": ["-q:v", "2"],
+    "jpeg": ["-q:v", "2"],
+    "png": ["-compression_level", "1"],
+}
+
+# 相邻两个请求帧的间隔不超过该值（秒）时合并为一次解码：只跳转一次，再用 select 滤镜顺序取帧；
+# 间隔更大时分别跳转，避免解码两帧之间的全部内容
+FRAME_BATCH_GAP = 2.0
+
+# CPU 核数不少于该值时，重新编码拼接改为各片段并行转码后再流复制拼接
+PARALLEL_CONCAT_MIN_CPUS = 4
+
+# pipeline 中间结果的编码参数：以未压缩的视频/PCM 音频写入 nut 流，
+# 下一步直接读取原始帧，省去一次编码和解码
+INTERMEDIATE_CODEC_PARAMS = ["-c:v", "rawvideo", "-c:a", "pcm_s16le"]
+
+# libx264 preset -> QSV preset（QSV 没有 ultrafast / superfast）
+QSV_PRESETS = {
+    "ultrafast": "veryfast",
+    "superfast": "veryfast",
+    "veryfast": "veryfast",
+    "faster": "faster",
+    "fast": "fast",
+    "medium": "medium",
+    "slow": "slow",
+    "slower": "slower",
+    "veryslow": "veryslow",
+}
+
+# libx264 preset -> NVENC preset（p1 最快，p7 质量最好）
+NVENC_PRESETS = {
+    "ultrafast": "p1",
+    "superfast": "p2",
+    "veryfast": "p3",
+    "faster": "p4",
+    "fast": "p4",
+    "medium": "p5",
+    "slow": "p6",
+    "slower": "p7",
+    "veryslow": "p7",
+}
+
+
+def _list_inputs() -> tuple:
+    """
+    列出输入目录中的文件（目录项顺序）
+
+    与原先的 glob("*") 不同，子目录和隐藏文件（以 "." 开头）都会被忽略：
+    子目录无法作为 ffmpeg 的输入，此前排在第一位时会导致处理失败；
+    隐藏文件通常是系统或编辑器留下的元数据文件（如 .DS_Store）。
+    os.scandir 的目录项自带文件类型，判断是否为文件通常不需要额外的 stat。
+    """
+    try:
+        with os.scandir(DATA_INPUTS) as entries:
+            return tuple(
+                entry.path for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            )
+    except FileNotFoundError:
+        return ()
+
+
+def _probe(media_path: Path, stat: Optional[os.stat_result] = None) -> dict:
+    """
+    读取媒体文件的容器头信息（不解码任何帧）
+
+    结果按 (路径, 修改时间, 文件大小) 缓存，同一文件被多个函数处理时只解析一次，
+    文件被改写后自动失效。调用方已有 os.stat 结果时可直接传入，省去一次系统调用。
+    """
+    if stat is None:
+        stat = os.stat(media_path)
+    return dict(_probe_cached(str(media_path), stat.st_mtime_ns, stat.st_size))
+
+
+@functools.lru_cache(maxsize=128)
+def _probe_cached(filename: str, mtime_ns: int, size: int) -> dict:
+    """
+    复用 MoviePy 对 `ffmpeg -i` 输出的解析，并补充 MoviePy 未解析的像素格式、时间基和音频参数
+
+    mtime_ns 和 size 只用作缓存键。
+    """
+    proc = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-i", ffmpeg_escape_filename(filename)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    output = proc.stderr.decode("utf8", errors="ignore")
+
+    try:
+        infos = FFmpegInfosParser(output, filename).parse()
+    except Exception as exc:
+        raise IOError(f"无法解析媒体文件信息:\n\n{output}") from exc
+
+    # 补充 MoviePy 未解析的字段（判断能否无重编码拼接时需要）
+    video_match = re.search(r"Stream #\d+:\d+.*?: Video: [^,]+, (\w+).*?([\d.]+k?) tbn", output)
+    infos["video_pix_fmt"] = video_match.group(1) if video_match else None
+    infos["video_tbn"] = video_match.group(2) if video_match else None
+
+    audio_match = re.search(r"Stream #\d+:\d+.*?: Audio: (\w+).*?Hz, ([^,]+)", output)
+    infos["audio_codec_name"] = audio_match.group(1) if audio_match else None
+    infos["audio_channels"] = audio_match.group(2) if audio_match else None
+    return infos
+
+
+def _prefetch(media_path: str) -> None:
+    """
+    提示内核预读整个输入文件到页缓存（POSIX_FADV_WILLNEED，立即返回，不阻塞）
+
+    只用于需要顺序读取整个文件的操作：ffmpeg 启动和解析文件头的同时，
+    内核已在后台读取后续数据。不支持 posix_fadvise 的平台上什么也不做。
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(media_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _output_path(name: str, output_format: str, output_prefix: str = "") -> str:
+    """输出文件路径（字符串形式，可直接用于 ffmpeg 命令行）"""
+    return os.path.join(os.fspath(DATA_OUTPUTS), f"{output_prefix}{name}.{output_format}")
+
+
+def _part_path(output_path: str) -> str:
+    """
+    输出文件写入过程中使用的临时路径
+
+    与最终文件同目录（保证 os.replace 是原子的），以 . 开头便于扫描目录时跳过，
+    并保留原扩展名，ffmpeg 仍可据此选择封装格式。
+    """
+    head, tail = os.path.split(output_path)
+    return os.path.join(head, f".part_{tail}")
+
+
+@contextlib.contextmanager
+def _atomic_outputs(*output_paths: str):
+    """
+    先写入临时文件，成功后再原子地重命名为最终文件名
+
+    轮询输出目录的读取方不会读到写了一半的文件；失败时清理临时文件，
+    不会留下残缺的输出。
+
+    Args:
+        output_paths: 最终输出路径
+
+    Yields:
+        与 output_paths 一一对应的临时路径列表
+    """
+    part_paths = [_part_path(path) for path in output_paths]
+    try:
+        yield part_paths
+        for part_path, output_path in zip(part_paths, output_paths):
+            os.replace(part_path, output_path)
+    finally:
+        for part_path in part_paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(part_path)
+
+
+def _ensure_output_dir() -> bool:
+    """
+    输出目录被外部删除时重新创建
+
+    Returns:
+        是否重新创建了目录
+    """
+    if os.path.isdir(DATA_OUTPUTS):
+        return False
+    DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
+    return True
+
+
+def _output_temp_dir(prefix: str) -> tempfile.TemporaryDirectory:
+    """
+    在输出目录下创建隐藏的临时目录
+
+    中间文件与最终输出位于同一文件系统，os.replace 不必跨设备复制，
+    也不会占满通常较小的系统临时目录（可能是 tmpfs）。
+    """
+    try:
+        return tempfile.TemporaryDirectory(dir=DATA_OUTPUTS, prefix=prefix)
+    except FileNotFoundError:
+        _ensure_output_dir()
+        return tempfile.TemporaryDirectory(dir=DATA_OUTPUTS, prefix=prefix)
+
+
+def _paths(video_path: Path, name: str, output_format: str, output_prefix: str = "") -> tuple:
+    """
+    一次性计算输入、输出路径的字符串形式
+
+    Returns:
+        (输入路径, 输出路径)
+    """
+    return (
+        ffmpeg_escape_filename(os.fspath(video_path)),
+        _output_path(name, output_format, output_prefix)
+    )
+
+
+def _stream_signature(infos: dict) -> tuple:
+    """
+    提取决定能否直接流复制拼接的编码参数
+
+    编码、分辨率、帧率、像素格式、时间基以及音频参数全部一致时，
+    concat demuxer 才能不经重编码直接拼接。
+    """
+    return (
+        infos.get("video_codec_name"),
+        tuple(infos.get("video_size") or ()),
+        infos.get("video_fps"),
+        infos.get("video_pix_fmt"),
+        infos.get("video_tbn"),
+        infos["audio_found"],
+        infos.get("audio_codec_name"),
+        infos.get("audio_fps"),
+        infos.get("audio_channels"),
+    )
+
+
+async def _concat_copy(input_files: list, output_path: str) -> None:
+    """使用 ffmpeg concat demuxer 直接流复制拼接（不解码、不编码）"""
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False, encoding="utf-8"
+    ) as list_file:
+        for path in input_files:
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+
+    try:
+        await _run_ffmpeg([
+            "-fflags", "+genpts", "-f", "concat", "-safe", "0", "-i", list_file.name,
+            "-c", "copy", *FASTSTART_PARAMS, output_path
+        ])
+    finally:
+        os.remove(list_file.name)
+
+
+@functools.lru_cache(maxsize=None)
+def _hw_encoder() -> Optional[str]:
+    """
+    检测可用的硬件 H.264 编码器（结果在进程内缓存）
+
+    Returns:
+        编码器名称，没有可用的硬件编码器时返回 None
+    """
+    proc = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-encoders"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True
+    )
+    listed = proc.stdout.decode("utf8", errors="ignore")
+
+    for encoder in HW_ENCODERS:
+        if not re.search(rf"\b{encoder}\b", listed):
+            continue
+
+        # 编码器编译进了 ffmpeg 不代表有可用的设备，用一次极短的编码确认
+        check = subprocess.run(
+            [
+                FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+                "-c:v", encoder, *HW_QUALITY_PARAMS.get(encoder, []), "-f", "null", "-"
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True
+        )
+        if check.returncode == 0:
+            return encoder
+
+    return None
+
+
+async def _hw_encoder_async(hwaccel: str) -> Optional[str]:
+    """
+    在线程中检测硬件编码器，避免协程中的同步 subprocess 阻塞事件循环
+
+    结果由 _hw_encoder 缓存，协程先调用本函数后，_video_codec 中的同步调用直接命中缓存。
+    hwaccel 不是 "auto" 时不做检测，返回 None。
+    """
+    if hwaccel != "auto":
+        return None
+    return await asyncio.to_thread(_hw_encoder)
+
+
+@functools.lru_cache(maxsize=None)
+def _has_filter(name: str) -> bool:
+    """检查 ffmpeg 是否编译了指定滤镜（结果在进程内缓存）"""
+    proc = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-filters"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True
+    )
+    return re.search(rf"\b{name}\b", proc.stdout.decode("utf8", errors="ignore")) is not None
+
+
+def _video_codec(
+    preset: str,
+    low_latency: bool = False,
+    fast_decode: bool = False,
+    hwaccel: str = "auto"
+) -> tuple:
+    """
+    选择视频编码器及其参数：优先使用硬件编码器，否则回退到 libx264
+
+    Args:
+        preset: libx264 编码速度预设，硬件编码器会映射到相近的档位
+        low_latency: 是否使用低延迟编码参数（忽略 preset）
+        fast_decode: 是否针对解码速度优化码流（libx264 的 fastdecode tune，硬件编码器忽略）
+        hwaccel: auto 使用可用的硬件编码器，none 始终使用 libx264
+
+    Returns:
+        (编码器名称, 编码参数列表)
+    """
+    encoder = _hw_encoder() if hwaccel == "auto" else None
+
+    if encoder == "h264_nvenc":
+        if low_latency:
+            params = ["-preset", "p1", "-tune", "ull"]
+        else:
+            params = ["-preset", NVENC_PRESETS.get(preset, "p4"), "-tune", "hq"]
+        return encoder, params + HW_QUALITY_PARAMS[encoder]
+    if encoder == "h264_qsv":
+        qsv_preset = "veryfast" if low_latency else QSV_PRESETS.get(preset, "medium")
+        return encoder, ["-preset", qsv_preset] + HW_QUALITY_PARAMS[encoder]
+    if encoder:
+        return encoder, list(HW_QUALITY_PARAMS.get(encoder, []))
+
+    params = list(X264_LOW_LATENCY_PARAMS) if low_latency else ["-preset", preset]
+
+    # 多个 tune 用逗号组合，如 fastdecode,zerolatency
+    tunes = [
+        tune for tune, enabled in (("fastdecode", fast_decode), ("zerolatency", low_latency))
+        if enabled
+    ]
+    if tunes:
+        params += ["-tune", ",".join(tunes)]
+
+    return "libx264", params
+
+
+def _scale_flags(original_size: tuple, new_size: tuple) -> str:
+    """
+    libswscale 缩放算法：缩小时用 area（按面积平均，抗锯齿且比 bicubic 更快），
+    放大时用 bicubic
+    """
+    if new_size[0] <= original_size[0] and new_size[1] <= original_size[1]:
+        return "area"
+    return "bicubic"
+
+
+def _frame_index(t: float, fps: float, n_frames: int) -> int:
+    """t 时刻所在帧的序号，与 MoviePy 的 get_frame 一致（最后一帧之后取最后一帧）"""
+    return min(int(fps * t + 0.00001), n_frames - 1)
+
+
+def _frame_seek_time(index: int, fps: float) -> float:
+    """
+    计算提取第 index 帧时使用的跳转时间
+
+    跳转到该帧之前半帧的位置，避免时间戳取整导致目标帧被丢弃。
+    """
+    return max(0.0, (index - 0.5) / fps)
+
+
+def _group_frames(indices: list, max_gap: int) -> list:
+    """
+    将帧序号去重排序后分组，组内相邻帧序号之差不超过 max_gap
+
+    Returns:
+        帧序号分组列表，每组升序排列
+    """
+    groups = []
+    for index in sorted(set(indices)):
+        if groups and index - groups[-1][-1] <= max_gap:
+            groups[-1].append(index)
+        else:
+            groups.append([index])
+    return groups
+
+
+def _valid_time_args(start_time: float, end_time: Optional[float]) -> bool:
+    """
+    不依赖视频时长的时间参数检查：开始时间非负，给出的结束时间晚于开始时间
+
+    在扫描输入、读取文件头之前调用，明显无效的参数不必启动 ffmpeg
+    """
+    return start_time >= 0 and not (end_time and end_time <= start_time)
+
+
+def _trim_range(duration: float, start_time: float, end_time: Optional[float]) -> Optional[tuple]:
+    """
+    计算实际剪辑区间（结束时间不超过视频时长）
+
+    Returns:
+        (实际结束时间, 剪辑后时长)，区间无效时返回 None
+    """
+    actual_end_time = min(end_time or duration, duration)
+    if start_time < 0 or start_time >= actual_end_time:
+        return None
+    return actual_end_time, actual_end_time - start_time
+
+
+def _trim_codec_args(
+    reencode: bool,
+    preset: str,
+    low_latency: bool,
+    fast_decode: bool,
+    hwaccel: str = "auto"
+) -> tuple:
+    """
+    剪辑时的编码参数：默认直接流复制，reencode=True 时重新编码
+
+    Returns:
+        (视频编码器名称, 编码参数列表)，流复制时编码器名称为 None
+    """
+    if reencode:
+        codec, codec_params = _video_codec(preset, low_latency, fast_decode, hwaccel)
+        return codec, ["-c:v", codec, *codec_params, "-c:a", "aac"]
+    # 流复制从起点之前的关键帧开始，不能用 -avoid_negative_ts make_zero 把时间戳平移到 0：
+    # 保留负时间戳时 mp4/mov 会写入编辑列表隐藏关键帧到起点之间的帧，平移后这些帧会被播放出来
+    return None, ["-c", "copy"]
+
+
+def _resize_dims(
+    original_size: tuple,
+    width: Optional[int],
+    height: Optional[int],
+    scale: Optional[float]
+) -> tuple:
+    """
+    计算目标尺寸：scale 优先；只给出宽或高时按原始比例计算另一边
+
+    Returns:
+        (新宽度, 新高度)
+    """
+    original_width, original_height = original_size
+
+    if scale:
+        return int(original_width * scale), int(original_height * scale)
+    if width and height:
+        return width, height
+    if width:
+        return width, int(original_height * width / original_width)
+    return int(original_width * height / original_height), height
+
+
+async def _run_ffmpeg(args: list, retry: bool = True) -> None:
+    """
+    以子进程方式异步调用 ffmpeg，等待期间不阻塞事件循环
+
+    失败时抛出异常，异常信息为 ffmpeg 的错误输出。输出目录已被删除导致的失败会在
+    重新创建目录后重试一次（retry=False 时不重试，用于无法重放输入的管道）。
+    """
+    proc = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error", *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        _, stderr = await proc.communicate()
+    except asyncio.CancelledError:
+        proc.kill()
+        await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        if retry and _ensure_output_dir():
+            return await _run_ffmpeg(args, retry=False)
+
+        error = stderr.decode("utf8", errors="ignore").strip()
+        raise RuntimeError(error or f"ffmpeg 退出码 {proc.returncode}")
+
+
+async def _run_ffmpeg_chain(commands: list) -> None:
+    """
+    同时运行通过 FIFO 串联的多个 ffmpeg 进程
+
+    下游读够数据后提前退出时，上游写入会收到 Broken pipe，这属于正常结束，以下游结果为准。
+    其他任一进程失败时立即终止其余进程（否则它们可能永远阻塞在 FIFO 的打开上）。
+    """
+    pending = {asyncio.ensure_future(_run_ffmpeg(args, retry=False)) for args in commands}
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            error = task.exception()
+            if error is None or "Broken pipe" in str(error):
+                continue
+
+            for other in pending:
+                other.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise error
+
+
+async def _run_encode(
+    codec: Optional[str],
+    input_args: list,
+    source: str,
+    output_args: list,
+    size: Optional[tuple] = None,
+    scale_flags: str = "bicubic"
+) -> None:
+    """
+    调用 ffmpeg 解码（可选缩放）并编码
+
+    使用有对应硬件解码的硬件编码器时，解码、缩放、编码全程在 GPU 上进行；
+    失败时（如源编码不支持硬件解码）回退到 CPU 解码，由 libswscale 缩放（SIMD 优化）。
+
+    Args:
+        codec: 视频编码器名称，None 表示不编码（流复制）
+        input_args: -i 之前的输入参数
+        source: 输入路径
+        output_args: 编码参数及输出路径
+        size: 缩放目标尺寸 (宽, 高)，None 表示不缩放
+        scale_flags: CPU 缩放时的 libswscale 算法
+    """
+    hw_pipeline = HW_PIPELINES.get(codec)
+
+    if hw_pipeline and (size is None or await asyncio.to_thread(_has_filter, hw_pipeline[1])):
+        decode_args, scale_filter = hw_pipeline
+        filter_args = ["-vf", f"{scale_filter}={size[0]}:{size[1]}"] if size else []
+        try:
+            await _run_ffmpeg([*input_args, *decode_args, "-i", source, *filter_args, *output_args])
+            return
+        except RuntimeError:
+            pass
+
+    filter_args = ["-vf", f"scale={size[0]}:{size[1]}:flags={scale_flags}"] if size else []
+    await _run_ffmpeg([*input_args, "-i", source, *filter_args, *output_args])
+
+
+def _safe(error_code: str = "PROCESSING_ERROR"):
+    """
+    将函数抛出的异常转换为错误结果 {"success": False, "error": ..., "error_code": ...}
+
+    同时支持普通函数和协程函数。协程在 try 之外创建，参数不匹配时的 TypeError
+    照常抛出（process_batch 据此返回 INVALID_PARAMS）。
+    """
+    def _decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def _async_wrapper(*args, **kwargs):
+                coro = func(*args, **kwargs)
+                try:
+                    return await coro
+                except Exception as e:
+                    return {"success": False, "error": str(e), "error_code": error_code}
+            return _async_wrapper
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                return {"success": False, "error": str(e), "error_code": error_code}
+        return _wrapper
+
+    return _decorator
+
+
+def _run_sync(coro) -> dict:
+    """
+    在同步函数中运行协程
+
+    调用方自身已处于事件循环中时（asyncio.run 不可嵌套），放到独立线程中运行。
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def _concat_layout(infos: list, method: str) -> tuple:
+    """
+    计算重新编码拼接时各片段统一使用的视频、音频滤镜
+
+    compose 与 MoviePy 一致：画布取最大宽高，较小的片段居中放在黑色背景上；
+    chain 将所有片段缩放到第一个片段的尺寸。帧率统一为最高帧率。
+
+    Returns:
+        (各片段的视频滤镜列表, 音频滤镜)；所有片段都没有音频时音频滤镜为 None，
+        否则没有音频的片段需要用 _silence_source 补静音
+    """
+    sizes = [info["video_size"] for info in infos]
+    if method == "compose":
+        width = max(size[0] for size in sizes)
+        height = max(size[1] for size in sizes)
+        fit = f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    else:
+        width, height = sizes[0]
+        fit = f"scale={width}:{height}"
+    fps = max(info["video_fps"] for info in infos)
+
+    video_filters = [f"{fit},setsar=1,fps={fps},format=yuv420p" for _ in infos]
+    if not any(info["audio_found"] for info in infos):
+        return video_filters, None
+    return video_filters, "aresample=44100,aformat=channel_layouts=stereo"
+
+
+def _silence_source(duration: float) -> str:
+    """与拼接音频格式一致的静音源（lavfi）"""
+    return f"aevalsrc=0:c=stereo:s=44100:d={duration}"
+
+
+def _concat_filter(infos: list, method: str) -> tuple:
+    """
+    构建重新编码拼接用的 filter_complex（单个 ffmpeg 进程完成统一参数和拼接）
+
+    Returns:
+        (filter_complex, 输出流映射参数)
+    """
+    video_filters, audio_filter = _concat_layout(infos, method)
+
+    filters = []
+    labels = ""
+    for i, (info, video_filter) in enumerate(zip(infos, video_filters)):
+        filters.append(f"[{i}:v]{video_filter}[v{i}]")
+        labels += f"[v{i}]"
+
+        if audio_filter:
+            if info["audio_found"]:
+                filters.append(f"[{i}:a]{audio_filter}[a{i}]")
+            else:
+                filters.append(f"{_silence_source(info['duration'])}[a{i}]")
+            labels += f"[a{i}]"
+
+    if audio_filter:
+        filters.append(f"{labels}concat=n={len(infos)}:v=1:a=1[v][a]")
+        return ";".join(filters), ["-map", "[v]", "-map", "[a]"]
+
+    filters.append(f"{labels}concat=n={len(infos)}:v=1:a=0[v]")
+    return ";".join(filters), ["-map", "[v]"]
+
+
+async def _concat_normalized(
+    input_files: list,
+    infos: list,
+    output_path: str,
+    method: str,
+    codec_args: list
+) -> None:
+    """
+    将各输入并行转码为统一参数的 Matroska 片段，再用 concat demuxer 流复制拼接
+
+    单个 ffmpeg 进程中 concat 滤镜按顺序逐个解码输入，解码和滤镜基本是串行的；
+    多核机器上按片段并行转码能同时利用多个核。
+    """
+    video_filters, audio_filter = _concat_layout(infos, method)
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    semaphore = asyncio.Semaphore(workers)
+    # 编码器默认按全部核数开线程，并行片段之间平分，避免线程数成倍超额
+    thread_args = ["-threads", str(max(1, (os.cpu_count() or 1) // workers))]
+
+    with _output_temp_dir(".concat_") as part_dir:
+        parts = [os.path.join(part_dir, f"part_{i:03d}.mkv") for i in range(len(input_files))]
+
+        async def normalize(video_path: str, info: dict, video_filter: str, part: str) -> None:
+            args = ["-i", ffmpeg_escape_filename(os.fspath(video_path))]
+            if audio_filter is None:
+                args += ["-an"]
+            elif info["audio_found"]:
+                args += ["-af", audio_filter]
+            else:
+                args += [
+                    "-f", "lavfi", "-i", _silence_source(info["duration"]),
+                    "-map", "0:v:0", "-map", "1:a:0"
+                ]
+
+            async with semaphore:
+                await _run_ffmpeg([
+                    *args, "-vf", video_filter, *codec_args, *thread_args, "-f", "matroska", part
+                ])
+
+        await asyncio.gather(*(
+            normalize(*job) for job in zip(input_files, infos, video_filters, parts)
+        ))
+        await _concat_copy(parts, output_path)
+
+
+def _audio_codec_args(audio_format: str, audio_bitrate: str, infos: dict) -> list:
+    """
+    提取音频的编码参数：源编码与目标格式一致时直接流复制，否则重新编码
+
+    Returns:
+        ffmpeg 输出参数
+    """
+    encoder, copy_codec = AUDIO_CODECS.get(audio_format.lower(), (None, None))
+
+    if copy_codec and infos["audio_codec_name"] == copy_codec:
+        return ["-c:a", "copy"]
+    if encoder:
+        if encoder in LOSSLESS_AUDIO_CODECS:
+            return ["-c:a", encoder]
+        return ["-c:a", encoder, "-b:a", audio_bitrate]
+    # 未知格式交由 ffmpeg 按扩展名选择编码器
+    return ["-b:a", audio_bitrate]
+
 
 def video_to_audio(
     audio_format: str = "mp3",
-    audio_bitrate: str = "192k"
+    audio_bitrate: str = "192k",
+    start_time: float = 0,
+    end_time: Optional[float] = None
 ) -> dict:
     """
     将视频文件转换为音频文件（v3.0 架构）
 
+    指定 start_time / end_time 时只导出该区间的音频，直接从视频中截取，
+    不必先导出完整音频再剪辑。
+
     Args:
         audio_format: 音频格式（mp3, wav, aac, flac 等）
         audio_bitrate: 音频比特率
+        start_time: 开始时间（秒）
+        end_time: 结束时间（秒），默认到视频结尾
 
     Returns:
         转换结果（不包含文件路径）
     """
-    try:
-        # 扫描输入目录
-        input_files = list(DATA_INPUTS.glob("*"))
-        if not input_files:
-            return {
-                "success": False,
-                "error": "未找到输入视频文件",
-                "error_code": "NO_INPUT_FILE"
-            }
+    return _run_sync(_video_to_audio_async(audio_format, audio_bitrate, start_time, end_time))
 
-        video_path = input_files[0]
 
-        # 加载视频
-        video = VideoFileClip(str(video_path))
+@_safe()
+async def _video_to_audio_async(
+    audio_format: str = "mp3",
+    audio_bitrate: str = "192k",
+    start_time: float = 0,
+    end_time: Optional[float] = None,
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    video_to_audio 的协程版本
 
-        if video.audio is None:
-            video.close()
-            return {
-                "success": False,
-                "error": "视频文件不包含音频轨道",
-                "error_code": "NO_AUDIO_TRACK"
-            }
+    参数与返回值同 video_to_audio；output_prefix 为输出文件名前缀，
+    并发执行多个任务时用于区分输出文件。
+    """
+    if not _valid_time_args(start_time, end_time):
+        return {
+            "success": False,
+            "error": f"无效的时间区间: {start_time} - {end_time}",
+            "error_code": "INVALID_TIME_RANGE"
+        }
 
-        duration = video.duration
+    # 扫描输入目录
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
 
-        # 输出文件
-        DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
-        output_path = DATA_OUTPUTS / f"audio.{audio_format}"
+    video_path = input_files[0]
 
-        # 提取音频
-        codec_map = {"aac": "aac", "m4a": "aac"}
-        codec = codec_map.get(audio_format.lower())
+    # 只读取容器头，不加载视频
+    infos = await asyncio.to_thread(_probe, video_path)
 
-        video.audio.write_audiofile(
-            str(output_path),
-            bitrate=audio_bitrate,
-            codec=codec,
-            logger=None  # 避免在容器环境中的 broken pipe 问题
-        )
+    if not infos["audio_found"]:
+        return {
+            "success": False,
+            "error": "视频文件不包含音频轨道",
+            "error_code": "NO_AUDIO_TRACK"
+        }
 
-        video.close()
+    trim_range = _trim_range(infos["duration"], start_time, end_time)
+    if trim_range is None:
+        return {
+            "success": False,
+            "error": f"无效的时间区间: {start_time} - {end_time or infos['duration']}",
+            "error_code": "INVALID_TIME_RANGE"
+        }
 
+    _, duration = trim_range
+    if duration == infos["duration"]:
+        # 只截取一段时不预读整个文件
+        _prefetch(video_path)
+
+    source, output_path = _paths(video_path, "audio", audio_format, output_prefix)
+    args = ["-i", source, "-vn", *_audio_codec_args(audio_format, audio_bitrate, infos)]
+    if duration < infos["duration"]:
+        # -ss 放在 -i 之前使用输入级跳转
+        args = ["-ss", str(start_time), *args, "-t", str(duration)]
+
+    with _atomic_outputs(output_path) as (part_path,):
+        await _run_ffmpeg(args + [part_path])
+
+    return {
+        "success": True,
+        "format": audio_format,
+        "duration": duration
+    }
+
+
+def video_to_audio_batch(
+    audio_formats: list,
+    audio_bitrate: str = "192k"
+) -> dict:
+    """
+    将视频中的音频一次导出为多种格式（v3.0 架构）
+
+    只调用一次 ffmpeg、音频只解码一次，各格式作为同一进程的多个输出。
+
+    Args:
+        audio_formats: 音频格式列表（如 ["mp3", "wav", "aac"]），重复的格式只导出一次
+        audio_bitrate: 有损格式的音频比特率
+
+    Returns:
+        转换结果（不包含文件路径）
+    """
+    return _run_sync(_video_to_audio_batch_async(audio_formats, audio_bitrate))
+
+
+@_safe()
+async def _video_to_audio_batch_async(
+    audio_formats: list,
+    audio_bitrate: str = "192k",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    video_to_audio_batch 的协程版本
+
+    参数与返回值同 video_to_audio_batch；output_prefix 为输出文件名前缀。
+    """
+    if (
+        not audio_formats
+        or not isinstance(audio_formats, list)
+        or not all(isinstance(audio_format, str) and audio_format for audio_format in audio_formats)
+    ):
         return {
-            "success": True,
-            "format": audio_format,
-            "duration": duration
+            "success": False,
+            "error": "audio_formats 参数必须是非空的格式列表",
+            "error_code": "INVALID_FORMATS"
         }
 
-    except Exception as e:
+    # 扫描输入目录
+    input_files = _list_inputs()
+    if not input_files:
         return {
             "success": False,
-            "error": str(e),
-            "error_code": "PROCESSING_ERROR"
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
         }
 
+    video_path = input_files[0]
+    infos = await asyncio.to_thread(_probe, video_path)
+
+    if not infos["audio_found"]:
+        return {
+            "success": False,
+            "error": "视频文件不包含音频轨道",
+            "error_code": "NO_AUDIO_TRACK"
+        }
+
+    _prefetch(video_path)
+
+    # 同一格式会写入同一个文件，去重并保持顺序
+    audio_formats = list(dict.fromkeys(audio_formats))
+    output_paths = [
+        _output_path("audio", audio_format, output_prefix) for audio_format in audio_formats
+    ]
+
+    args = ["-i", ffmpeg_escape_filename(os.fspath(video_path))]
+    for audio_format, output_path in zip(audio_formats, output_paths):
+        args += [
+            "-map", "0:a:0", *_audio_codec_args(audio_format, audio_bitrate, infos),
+            _part_path(output_path)
+        ]
+
+    with _atomic_outputs(*output_paths):
+        await _run_ffmpeg(args)
+
+    return {
+        "success": True,
+        "count": len(audio_formats),
+        "formats": audio_formats,
+        "duration": infos["duration"]
+    }
+
 
 def concatenate_videos(
     output_format: str = "mp4",
-    method: str = "compose"
+    method: str = "compose",
+    preset: str = DEFAULT_PRESET,
+    stream_copy: bool = True,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto"
 ) -> dict:
     """
     拼接多个视频文件（v3.0 架构）
 
+    所有输入的编码参数一致时直接流复制拼接，不做任何重编码；
+    否则按 method 重新编码。
+
     Args:
         output_format: 输出视频格式
         method: 拼接方法（compose 或 chain）
+        preset: libx264 编码速度预设（ultrafast ~ veryslow）
+        stream_copy: 输入编码参数一致时是否直接流复制（False 则始终重新编码）
+        downstream_decode: 输出还会被再次读取处理时设为 True，编码时针对解码速度优化（fastdecode）
+        hwaccel: 硬件加速（auto 自动使用可用的硬件编解码，none 始终使用 CPU）
 
     Returns:
         拼接结果（不包含文件路径）
     """
-    try:
-        # 扫描输入目录
-        input_files = list(DATA_INPUTS.glob("*"))
-        if len(input_files) < 2:
-            return {
-                "success": False,
-                "error": "至少需要2个视频文件进行拼接",
-                "error_code": "INSUFFICIENT_FILES"
-            }
+    return _run_sync(_concatenate_videos_async(
+        output_format, method, preset, stream_copy, downstream_decode, hwaccel
+    ))
 
-        # 加载所有视频
-        clips = []
-        total_duration = 0
 
-        for video_path in input_files:
-            clip = VideoFileClip(str(video_path))
-            clips.append(clip)
-            total_duration += clip.duration
-
-        # 拼接视频
-        if method == "compose":
-            final_clip = concatenate_videoclips(clips, method="compose")
-        elif method == "chain":
-            final_clip = concatenate_videoclips(clips, method="chain")
-        else:
-            for clip in clips:
-                clip.close()
-            return {
-                "success": False,
-                "error": f"不支持的拼接方法: {method}",
-                "error_code": "INVALID_METHOD"
-            }
-
-        # 输出
-        DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
-        output_path = DATA_OUTPUTS / f"concatenated.{output_format}"
+@_safe()
+async def _concatenate_videos_async(
+    output_format: str = "mp4",
+    method: str = "compose",
+    preset: str = DEFAULT_PRESET,
+    stream_copy: bool = True,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    concatenate_videos 的协程版本
 
-        final_clip.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
-            logger=None  # 避免在容器环境中的 broken pipe 问题
-        )
+    参数与返回值同 concatenate_videos；output_prefix 为输出文件名前缀。
+    """
+    # 扫描输入目录
+    input_files = _list_inputs()
+    if len(input_files) < 2:
+        return {
+            "success": False,
+            "error": "至少需要2个视频文件进行拼接",
+            "error_code": "INSUFFICIENT_FILES"
+        }
 
-        # 关闭所有
-        final_clip.close()
-        for clip in clips:
-            clip.close()
+    if method not in ("compose", "chain"):
+        return {
+            "success": False,
+            "error": f"不支持的拼接方法: {method}",
+            "error_code": "INVALID_METHOD"
+        }
 
+    if hwaccel not in HWACCEL_MODES:
         return {
-            "success": True,
-            "count": len(input_files),
-            "total_duration": total_duration,
-            "method": method
+            "success": False,
+            "error": f"不支持的硬件加速模式: {hwaccel}",
+            "error_code": "INVALID_HWACCEL"
         }
 
-    except Exception as e:
+    # 每个文件只 stat 一次，结果同时用作信息缓存的键
+    try:
+        stats = [os.stat(video_path) for video_path in input_files]
+    except FileNotFoundError as e:
         return {
             "success": False,
-            "error": str(e),
-            "error_code": "PROCESSING_ERROR"
+            "error": f"输入文件不存在: {e.filename}",
+            "error_code": "FILE_NOT_FOUND"
         }
 
+    # 只读取容器头
+    infos = await asyncio.gather(*(
+        asyncio.to_thread(_probe, video_path, stat) for video_path, stat in zip(input_files, stats)
+    ))
+    total_duration = sum(info["duration"] for info in infos)
+
+    # 拼接会顺序读完所有输入
+    for video_path in input_files:
+        _prefetch(video_path)
+
+    output_path = _output_path("concatenated", output_format, output_prefix)
+
+    with _atomic_outputs(output_path) as (part_path,):
+        # 编码参数全部一致时无需重编码
+        if stream_copy and len({_stream_signature(info) for info in infos}) == 1:
+            try:
+                await _concat_copy(input_files, part_path)
+                return {
+                    "success": True,
+                    "count": len(input_files),
+                    "total_duration": total_duration,
+                    "method": method,
+                    "stream_copy": True
+                }
+            except RuntimeError:
+                # 目标容器无法直接容纳源编码等情况，回退到重新编码
+                pass
+
+        await _hw_encoder_async(hwaccel)
+        codec, codec_params = _video_codec(preset, fast_decode=downstream_decode, hwaccel=hwaccel)
+        codec_args = ["-c:v", codec, *codec_params, "-c:a", "aac"]
+
+        if (os.cpu_count() or 1) >= PARALLEL_CONCAT_MIN_CPUS:
+            # 多核：各片段并行转码后流复制拼接
+            await _concat_normalized(input_files, infos, part_path, method, codec_args)
+        else:
+            # 由 ffmpeg 一次完成解码、统一尺寸和帧率、拼接和编码，不经过 Python 逐帧处理
+            input_args = []
+            for video_path in input_files:
+                input_args += ["-i", ffmpeg_escape_filename(os.fspath(video_path))]
+            filter_complex, map_args = _concat_filter(infos, method)
+
+            await _run_ffmpeg([
+                *input_args,
+                "-filter_complex", filter_complex, *map_args,
+                *codec_args, *FASTSTART_PARAMS, part_path
+            ])
+
+    return {
+        "success": True,
+        "count": len(input_files),
+        "total_duration": total_duration,
+        "method": method,
+        "stream_copy": False
+    }
+
 
 def trim_video(
     start_time: float,
     end_time: Optional[float] = None,
-    output_format: str = "mp4"
+    output_format: str = "mp4",
+    reencode: bool = False,
+    preset: str = DEFAULT_PRESET,
+    low_latency: bool = False,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto"
 ) -> dict:
     """
     剪辑视频（v3.0 架构）
 
+    默认直接流复制（不解码、不编码）：mp4/mov 输出借助编辑列表从起点开始播放，
+    其他容器的起点会对齐到之前最近的关键帧；
+    需要逐帧精确剪辑时设置 reencode=True。
+
     Args:
         start_time: 开始时间（秒）
         end_time: 结束时间（秒，可选）
         output_format: 输出格式
+        reencode: 是否重新编码以实现逐帧精确剪辑
+        preset: 重新编码时的 libx264 编码速度预设
+        low_latency: 重新编码时使用低延迟参数（关闭 B 帧，适合极短片段，压缩率下降约 5-10%）
+        downstream_decode: 输出还会被再次读取处理时设为 True，编码时针对解码速度优化（fastdecode）
+        hwaccel: 重新编码时的硬件加速（auto 自动使用可用的硬件编解码，none 始终使用 CPU）
 
     Returns:
-        剪辑结果（不包含文件路径）
+        剪辑结果（不包含文件路径）；duration 为输出文件的实际时长，流复制时可能略长于请求的区间
     """
-    try:
-        # 扫描输入
-        input_files = list(DATA_INPUTS.glob("*"))
-        if not input_files:
-            return {
-                "success": False,
-                "error": "未找到输入视频文件",
-                "error_code": "NO_INPUT_FILE"
-            }
+    return _run_sync(_trim_video_async(
+        start_time, end_time, output_format, reencode, preset, low_latency, downstream_decode,
+        hwaccel
+    ))
 
-        video_path = input_files[0]
-        video = VideoFileClip(str(video_path))
 
-        # 保存原始时长
-        original_duration = video.duration
+@_safe()
+async def _trim_video_async(
+    start_time: float,
+    end_time: Optional[float] = None,
+    output_format: str = "mp4",
+    reencode: bool = False,
+    preset: str = DEFAULT_PRESET,
+    low_latency: bool = False,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    trim_video 的协程版本
 
-        # 剪辑
-        trimmed = video.subclip(start_time, end_time)
+    参数与返回值同 trim_video；output_prefix 为输出文件名前缀。
+    """
+    if hwaccel not in HWACCEL_MODES:
+        return {
+            "success": False,
+            "error": f"不支持的硬件加速模式: {hwaccel}",
+            "error_code": "INVALID_HWACCEL"
+        }
 
-        # 保存剪辑后的时长
-        trimmed_duration = trimmed.duration
-        actual_end_time = end_time or original_duration
+    if not _valid_time_args(start_time, end_time):
+        return {
+            "success": False,
+            "error": f"无效的剪辑区间: {start_time} - {end_time}",
+            "error_code": "INVALID_TIME_RANGE"
+        }
+
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
+
+    video_path = input_files[0]
 
-        # 输出
-        DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
-        output_path = DATA_OUTPUTS / f"trimmed.{output_format}"
+    # 原始时长只从容器头读取
+    original_duration = (await asyncio.to_thread(_probe, video_path))["duration"]
+    trim_range = _trim_range(original_duration, start_time, end_time)
 
-        trimmed.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
-            logger=None  # 避免在容器环境中的 broken pipe 问题
+    if trim_range is None:
+        return {
+            "success": False,
+            "error": f"无效的剪辑区间: {start_time} - {end_time or original_duration}",
+            "error_code": "INVALID_TIME_RANGE"
+        }
+
+    actual_end_time, trimmed_duration = trim_range
+
+    source, output_path = _paths(video_path, "trimmed", output_format, output_prefix)
+
+    # -ss 放在 -i 之前使用输入级跳转，只需从最近的关键帧开始读取
+    if reencode:
+        await _hw_encoder_async(hwaccel)
+    codec, codec_args = _trim_codec_args(
+        reencode, preset, low_latency, downstream_decode, hwaccel
+    )
+    with _atomic_outputs(output_path) as (part_path,):
+        await _run_encode(
+            codec,
+            ["-ss", str(start_time)],
+            source,
+            ["-t", str(trimmed_duration), *codec_args, *FASTSTART_PARAMS, part_path]
         )
 
-        video.close()
-        trimmed.close()
+    # 流复制时输出从关键帧开始、按整包截断，实际时长可能长于请求的区间，从输出文件头读取
+    return {
+        "success": True,
+        "start_time": start_time,
+        "end_time": actual_end_time,
+        "duration": (await asyncio.to_thread(_probe, output_path))["duration"]
+    }
+
+
+def trim_video_batch(
+    jobs: list,
+    output_format: str = "mp4",
+    reencode: bool = False,
+    preset: str = DEFAULT_PRESET,
+    hwaccel: str = "auto"
+) -> dict:
+    """
+    从同一视频中一次剪辑出多个片段（v3.0 架构）
 
+    所有片段由一次 ffmpeg 调用完成，只付出一次进程启动开销，适合大量短片段。
+    输出文件按片段顺序命名（trimmed_001.mp4, trimmed_002.mp4, ...）。
+
+    Args:
+        jobs: 片段列表，每个片段为 {"start_time": 开始时间, "end_time": 结束时间（可选）}
+        output_format: 输出格式
+        reencode: 是否重新编码以实现逐帧精确剪辑
+        preset: 重新编码时的 libx264 编码速度预设
+        hwaccel: 重新编码时的硬件加速（auto 自动使用可用的硬件编码器，none 始终使用 CPU）
+
+    Returns:
+        剪辑结果（不包含文件路径），results 按片段顺序排列
+    """
+    return _run_sync(_trim_video_batch_async(jobs, output_format, reencode, preset, hwaccel))
+
+
+@_safe()
+async def _trim_video_batch_async(
+    jobs: list,
+    output_format: str = "mp4",
+    reencode: bool = False,
+    preset: str = DEFAULT_PRESET,
+    hwaccel: str = "auto",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    trim_video_batch 的协程版本
+
+    参数与返回值同 trim_video_batch；output_prefix 为输出文件名前缀。
+    """
+    if hwaccel not in HWACCEL_MODES:
         return {
-            "success": True,
-            "start_time": start_time,
-            "end_time": actual_end_time,
-            "duration": trimmed_duration
+            "success": False,
+            "error": f"不支持的硬件加速模式: {hwaccel}",
+            "error_code": "INVALID_HWACCEL"
         }
 
-    except Exception as e:
+    if not jobs or not isinstance(jobs, list):
         return {
             "success": False,
-            "error": str(e),
-            "error_code": "PROCESSING_ERROR"
+            "error": "jobs 参数必须是非空列表",
+            "error_code": "INVALID_JOBS"
         }
 
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
+
+    video_path = input_files[0]
+    original_duration = (await asyncio.to_thread(_probe, video_path))["duration"]
+    source = ffmpeg_escape_filename(os.fspath(video_path))
+    if reencode:
+        await _hw_encoder_async(hwaccel)
+    _, codec_args = _trim_codec_args(reencode, preset, False, False, hwaccel)
+
+    # 每个片段各自作为一路输入（-ss 在 -i 之前，保持输入级跳转），各映射到一个输出
+    input_args = []
+    output_args = []
+    output_paths = []
+    input_count = 0
+    results = []
+    for i, job in enumerate(jobs):
+        start_time = job.get("start_time") if isinstance(job, dict) else None
+        if not isinstance(start_time, (int, float)):
+            results.append({
+                "success": False,
+                "error": "片段必须包含数值类型的 start_time",
+                "error_code": "INVALID_PARAMS"
+            })
+            continue
+
+        end_time = job.get("end_time")
+        if end_time is not None and not isinstance(end_time, (int, float)):
+            results.append({
+                "success": False,
+                "error": "片段的 end_time 必须是数值",
+                "error_code": "INVALID_PARAMS"
+            })
+            continue
+
+        trim_range = _trim_range(original_duration, start_time, end_time)
+        if trim_range is None:
+            results.append({
+                "success": False,
+                "error": f"无效的剪辑区间: {start_time} - {end_time or original_duration}",
+                "error_code": "INVALID_TIME_RANGE"
+            })
+            continue
+
+        actual_end_time, trimmed_duration = trim_range
+        output_path = _output_path(f"trimmed_{i + 1:03d}", output_format, output_prefix)
+        output_paths.append(output_path)
+        input_args += ["-ss", str(start_time), "-i", source]
+        output_args += [
+            "-map", f"{input_count}:v:0", "-map", f"{input_count}:a:0?",
+            "-t", str(trimmed_duration),
+            *codec_args, *FASTSTART_PARAMS, _part_path(output_path)
+        ]
+        input_count += 1
+        results.append({
+            "success": True,
+            "start_time": start_time,
+            "end_time": actual_end_time
+        })
+
+    if input_count:
+        with _atomic_outputs(*output_paths):
+            await _run_ffmpeg(input_args + output_args)
+
+        # 与 trim_video 相同，duration 为输出文件的实际时长
+        infos = await asyncio.gather(*(asyncio.to_thread(_probe, path) for path in output_paths))
+        succeeded = [result for result in results if result["success"]]
+        for result, info in zip(succeeded, infos):
+            result["duration"] = info["duration"]
+
+    return {
+        "success": True,
+        "count": len(results),
+        "failed_count": sum(1 for result in results if not result["success"]),
+        "results": results
+    }
+
 
 def resize_video(
     width: Optional[int] = None,
     height: Optional[int] = None,
     scale: Optional[float] = None,
-    output_format: str = "mp4"
+    output_format: str = "mp4",
+    preset: str = DEFAULT_PRESET,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto"
 ) -> dict:
     """
     调整视频尺寸（v3.0 架构）
@@ -247,83 +1400,95 @@ def resize_video(
         height: 目标高度（像素）
         scale: 缩放比例（如 0.5 表示缩小到原来的一半）
         output_format: 输出格式
+        preset: libx264 编码速度预设
+        downstream_decode: 输出还会被再次读取处理时设为 True，编码时针对解码速度优化（fastdecode）
+        hwaccel: 硬件加速（auto 自动使用可用的硬件编解码和缩放，none 始终使用 CPU）
 
     Returns:
         调整结果（不包含文件路径）
     """
-    try:
-        if not any([width, height, scale]):
-            return {
-                "success": False,
-                "error": "必须提供 width, height 或 scale 中的至少一个参数",
-                "error_code": "MISSING_PARAMETERS"
-            }
+    return _run_sync(_resize_video_async(
+        width, height, scale, output_format, preset, downstream_decode, hwaccel
+    ))
 
-        # 扫描输入
-        input_files = list(DATA_INPUTS.glob("*"))
-        if not input_files:
-            return {
-                "success": False,
-                "error": "未找到输入视频文件",
-                "error_code": "NO_INPUT_FILE"
-            }
 
-        video_path = input_files[0]
-        video = VideoFileClip(str(video_path))
-
-        original_width, original_height = video.size
-
-        # 计算新尺寸
-        if scale:
-            new_width = int(original_width * scale)
-            new_height = int(original_height * scale)
-        elif width and height:
-            new_width, new_height = width, height
-        elif width:
-            ratio = width / original_width
-            new_width = width
-            new_height = int(original_height * ratio)
-        else:  # height
-            ratio = height / original_height
-            new_width = int(original_width * ratio)
-            new_height = height
-
-        # 调整尺寸
-        resized = video.resized((new_width, new_height))
-
-        # 输出
-        DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
-        output_path = DATA_OUTPUTS / f"resized.{output_format}"
-
-        resized.write_videofile(
-            str(output_path),
-            codec="libx264",
-            audio_codec="aac",
-            logger=None  # 避免在容器环境中的 broken pipe 问题
-        )
+@_safe()
+async def _resize_video_async(
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    scale: Optional[float] = None,
+    output_format: str = "mp4",
+    preset: str = DEFAULT_PRESET,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    resize_video 的协程版本
 
-        video.close()
-        resized.close()
+    参数与返回值同 resize_video；output_prefix 为输出文件名前缀。
+    """
+    if not any([width, height, scale]):
+        return {
+            "success": False,
+            "error": "必须提供 width, height 或 scale 中的至少一个参数",
+            "error_code": "MISSING_PARAMETERS"
+        }
 
+    if hwaccel not in HWACCEL_MODES:
         return {
-            "success": True,
-            "original_width": original_width,
-            "original_height": original_height,
-            "new_width": new_width,
-            "new_height": new_height
+            "success": False,
+            "error": f"不支持的硬件加速模式: {hwaccel}",
+            "error_code": "INVALID_HWACCEL"
         }
 
-    except Exception as e:
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
         return {
             "success": False,
-            "error": str(e),
-            "error_code": "PROCESSING_ERROR"
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
         }
 
+    video_path = input_files[0]
+    original_width, original_height = (await asyncio.to_thread(_probe, video_path))["video_size"]
+    _prefetch(video_path)
+
+    # 计算新尺寸
+    new_width, new_height = _resize_dims(
+        (original_width, original_height), width, height, scale
+    )
+
+    source, output_path = _paths(video_path, "resized", output_format, output_prefix)
+    await _hw_encoder_async(hwaccel)
+    codec, codec_params = _video_codec(preset, fast_decode=downstream_decode, hwaccel=hwaccel)
+    output_args = [
+        "-c:v", codec, *codec_params, "-c:a", "aac",
+        *FASTSTART_PARAMS, _part_path(output_path)
+    ]
+
+    with _atomic_outputs(output_path):
+        await _run_encode(
+            codec, [], source, output_args,
+            size=(new_width, new_height),
+            scale_flags=_scale_flags((original_width, original_height), (new_width, new_height))
+        )
+
+    return {
+        "success": True,
+        "original_width": original_width,
+        "original_height": original_height,
+        "new_width": new_width,
+        "new_height": new_height
+    }
+
 
 def extract_frames(
     times: list,
-    output_format: str = "jpg"
+    output_format: str = "jpg",
+    hwaccel: str = "auto"
 ) -> dict:
     """
     从视频中提取指定时间点的帧（v3.0 架构）
@@ -331,59 +1496,554 @@ def extract_frames(
     Args:
         times: 要提取的时间点列表（秒）
         output_format: 图片格式
+        hwaccel: 硬件加速（auto 自动使用可用的硬件解码，none 始终使用 CPU）
 
     Returns:
         提取结果（不包含文件路径）
     """
-    try:
-        if not times or not isinstance(times, list):
+    return _run_sync(_extract_frames_async(times, output_format, hwaccel))
+
+
+@_safe()
+async def _extract_frames_async(
+    times: list,
+    output_format: str = "jpg",
+    hwaccel: str = "auto",
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    extract_frames 的协程版本
+
+    参数与返回值同 extract_frames；output_prefix 为输出文件名前缀。
+    """
+    if not times or not isinstance(times, list):
+        return {
+            "success": False,
+            "error": "times 参数必须是非空列表",
+            "error_code": "INVALID_TIMES"
+        }
+
+    if hwaccel not in HWACCEL_MODES:
+        return {
+            "success": False,
+            "error": f"不支持的硬件加速模式: {hwaccel}",
+            "error_code": "INVALID_HWACCEL"
+        }
+
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
+
+    video_path = input_files[0]
+    infos = await asyncio.to_thread(_probe, video_path)
+    duration = infos["duration"]
+
+    source = ffmpeg_escape_filename(os.fspath(video_path))
+    fps = infos["video_fps"]
+    n_frames = infos["video_n_frames"]
+
+    # 有效时间点 -> (序号, 帧序号)
+    targets = [
+        (i, _frame_index(t, fps, n_frames))
+        for i, t in enumerate(times)
+        if 0 <= t <= duration
+    ]
+    groups = _group_frames([index for _, index in targets], int(FRAME_BATCH_GAP * fps))
+
+    # 每组调用一次 ffmpeg：-ss 在 -i 之前使用输入级跳转到组内第一帧，之后顺序解码，
+    # 用 select 滤镜取出组内各帧，不必每帧重新跳转。
+    # 与单帧跳转一致，取时间戳不早于目标帧前半帧的第一帧；不按解码帧计数选帧，
+    # 因为容器的起始时间戳不一定为 0，计数会与时间错位
+    frame_files = {}
+    jobs = []
+    with _output_temp_dir(".frames_") as frame_dir:
+        for g, group in enumerate(groups):
+            seek_time = _frame_seek_time(group[0], fps)
+            select = "+".join(
+                f"gte(t,{lower})*not(gte(prev_t,{lower}))"
+                for lower in (_frame_seek_time(index, fps) - seek_time for index in group)
+            )
+            pattern = os.path.join(frame_dir, f"{g}_%d.{output_format}")
+            frame_files.update(
+                (index, pattern % (k + 1)) for k, index in enumerate(group)
+            )
+            jobs.append([
+                "-ss", str(seek_time),
+                "-i", source,
+                "-vf", f"select='{select}'",
+                "-fps_mode", "passthrough",
+                "-frames:v", str(len(group)),
+                *FRAME_ENCODE_PARAMS.get(output_format.lower(), []),
+                pattern
+            ])
+
+        # 各组相互独立，并发执行（并发数不超过 CPU 核数）
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        decode_args = HW_FRAME_DECODERS.get(await _hw_encoder_async(hwaccel))
+
+        async def run_job(args: list) -> None:
+            async with semaphore:
+                # 优先使用硬件解码，源编码不支持等情况下回退到 CPU 解码
+                if decode_args:
+                    try:
+                        await _run_ffmpeg([*decode_args, *args])
+                        return
+                    except RuntimeError:
+                        pass
+                await _run_ffmpeg(args)
+
+        await asyncio.gather(*(run_job(args) for args in jobs))
+
+        # 容器时长可能长于视频流（如音频比视频长），视频结尾之后的帧 select 取不到；
+        # 与 MoviePy 的 get_frame 一致，这些时间点取视频的最后一帧
+        missing = [index for index in sorted(frame_files) if not os.path.exists(frame_files[index])]
+        if missing:
+            last_frame = os.path.join(frame_dir, f"last.{output_format}")
+            found = await _extract_last_frame(
+                source, _frame_seek_time(missing[0], fps), output_format, last_frame
+            )
+            for index in missing:
+                frame_files[index] = last_frame if found else None
+
+        # 全部帧就绪后再按请求顺序命名；同一文件被多次使用时复制已输出的文件
+        written = {}
+        for i, index in targets:
+            frame_file = frame_files[index]
+            if frame_file is None:
+                continue
+            output_path = _output_path(f"frame_{i+1:03d}", output_format, output_prefix)
+            if frame_file in written:
+                shutil.copyfile(written[frame_file], output_path)
+            else:
+                os.replace(frame_file, output_path)
+                written[frame_file] = output_path
+
+    extracted_count = sum(1 for _, index in targets if frame_files[index] is not None)
+
+    return {
+        "success": True,
+        "requested_count": len(times),
+        "extracted_count": extracted_count,
+        "format": output_format
+    }
+
+
+async def _extract_last_frame(source: str, before: float, output_format: str, path: str) -> bool:
+    """
+    提取 before 之前视频流的最后一帧
+
+    只在视频流比容器短时使用，此时并不知道视频流在哪里结束：从 before 向前跳转，
+    解码到 before 为止，只保留最后一帧（-update 1）；窗口内没有帧时加倍窗口重试。
+
+    Returns:
+        是否提取到帧（视频流中没有任何帧时为 False）
+    """
+    window = FRAME_BATCH_GAP
+    while True:
+        start = max(0.0, before - window)
+        await _run_ffmpeg([
+            "-ss", str(start),
+            "-i", source,
+            "-t", str(before - start),
+            "-map", "0:v:0",
+            "-fps_mode", "passthrough",
+            "-update", "1",
+            *FRAME_ENCODE_PARAMS.get(output_format.lower(), []),
+            path
+        ])
+        if os.path.exists(path):
+            return True
+        if start == 0.0:
+            return False
+        window *= 2
+
+
+@_safe()
+def get_video_info() -> dict:
+    """
+    获取视频基本信息（v3.0 架构）
+
+    只读取容器头，不解码任何帧，也不创建 VideoFileClip；结果按文件版本缓存，
+    反复查询同一文件几乎没有开销。
+
+    Returns:
+        视频信息（不包含文件路径）
+    """
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
+
+    video_path = input_files[0]
+    stat = os.stat(video_path)
+    infos = _probe(video_path, stat)
+
+    width, height = infos.get("video_size") or (None, None)
+
+    return {
+        "success": True,
+        "duration": infos["duration"],
+        "fps": infos.get("video_fps"),
+        "width": width,
+        "height": height,
+        "video_codec": infos.get("video_codec_name"),
+        "has_audio": infos["audio_found"],
+        "audio_codec": infos.get("audio_codec_name"),
+        "file_size": stat.st_size
+    }
+
+
+def _pipeline_trim(
+    state: dict,
+    final: bool,
+    start_time: float,
+    end_time: Optional[float] = None,
+    output_format: str = "mp4",
+    reencode: bool = False,
+    preset: str = DEFAULT_PRESET,
+    low_latency: bool = False,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto"
+) -> tuple:
+    """
+    pipeline 中的剪辑步骤（参数同 trim_video），并更新 state 中的时长
+
+    Returns:
+        (步骤结果, 输入参数, 输出参数)
+    """
+    trim_range = _trim_range(state["duration"], start_time, end_time)
+    if trim_range is None:
+        return {
+            "success": False,
+            "error": f"无效的剪辑区间: {start_time} - {end_time or state['duration']}",
+            "error_code": "INVALID_TIME_RANGE"
+        }, None, None
+
+    actual_end_time, trimmed_duration = trim_range
+    state["duration"] = trimmed_duration
+
+    if not final:
+        # 中间步骤解码为原始帧传给下一步：流复制的起点对齐到关键帧，
+        # 而 nut 没有 mp4 那样的编辑列表，多出的帧无法被隐藏
+        codec_args = list(INTERMEDIATE_CODEC_PARAMS)
+        state["raw"] = True
+    else:
+        # 上一步输出的是原始帧时，最后一步必须编码
+        _, codec_args = _trim_codec_args(
+            reencode or state["raw"], preset, low_latency, downstream_decode, hwaccel
+        )
+
+    return {
+        "success": True,
+        "start_time": start_time,
+        "end_time": actual_end_time,
+        "duration": trimmed_duration
+    }, ["-ss", str(start_time)], ["-t", str(trimmed_duration), *codec_args]
+
+
+def _pipeline_resize(
+    state: dict,
+    final: bool,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    scale: Optional[float] = None,
+    output_format: str = "mp4",
+    preset: str = DEFAULT_PRESET,
+    downstream_decode: bool = False,
+    hwaccel: str = "auto"
+) -> tuple:
+    """
+    pipeline 中的调整尺寸步骤（参数同 resize_video），并更新 state 中的尺寸
+
+    Returns:
+        (步骤结果, 输入参数, 输出参数)
+    """
+    if not any([width, height, scale]):
+        return {
+            "success": False,
+            "error": "必须提供 width, height 或 scale 中的至少一个参数",
+            "error_code": "MISSING_PARAMETERS"
+        }, None, None
+
+    original_width, original_height = state["video_size"]
+    new_width, new_height = _resize_dims(state["video_size"], width, height, scale)
+    scale_flags = _scale_flags(state["video_size"], (new_width, new_height))
+    state["video_size"] = (new_width, new_height)
+
+    if final:
+        codec, codec_params = _video_codec(preset, fast_decode=downstream_decode, hwaccel=hwaccel)
+        codec_args = ["-c:v", codec, *codec_params, "-c:a", "aac"]
+    else:
+        codec_args = list(INTERMEDIATE_CODEC_PARAMS)
+        state["raw"] = True
+
+    return {
+        "success": True,
+        "original_width": original_width,
+        "original_height": original_height,
+        "new_width": new_width,
+        "new_height": new_height
+    }, [], ["-vf", f"scale={new_width}:{new_height}:flags={scale_flags}", *codec_args]
+
+
+def _fuse_steps(commands: list) -> list:
+    """
+    合并可以在同一个 ffmpeg 进程中完成的相邻步骤
+
+    上一步输出原始帧、且没有 -vf 时（如剪辑），它的输出参数可以直接放在下一步之前；
+    下一步不能有输入参数（如剪辑的 -ss，它作用于上一步的结果而不是源文件）。
+    合并后少一个进程，也省去一次原始帧经管道的传输。
+
+    Args:
+        commands: 各步骤的 (输入参数, 输出参数)
+
+    Returns:
+        合并后的 (输入参数, 输出参数) 列表
+    """
+    codec_count = len(INTERMEDIATE_CODEC_PARAMS)
+    fused = [commands[0]]
+    for input_args, output_args in commands[1:]:
+        prev_input_args, prev_output_args = fused[-1]
+        if (
+            not input_args
+            and prev_output_args[-codec_count:] == INTERMEDIATE_CODEC_PARAMS
+            and "-vf" not in prev_output_args
+        ):
+            fused[-1] = (prev_input_args, prev_output_args[:-codec_count] + output_args)
+        else:
+            fused.append((input_args, output_args))
+    return fused
+
+
+# pipeline 支持的步骤 -> (步骤函数, 输出文件名)
+PIPELINE_STEPS = {
+    "trim_video": (_pipeline_trim, "trimmed"),
+    "resize_video": (_pipeline_resize, "resized"),
+}
+
+
+def pipeline(steps: list) -> dict:
+    """
+    串联执行多个处理步骤（v3.0 架构）
+
+    各步骤的 ffmpeg 进程同时运行，中间结果经命名管道（FIFO）以 nut 流直接传给下一步，
+    不写入磁盘；只有最后一步的结果写入输出目录。能在同一进程中完成的相邻步骤
+    （如先剪辑再调整尺寸）合并为一次 ffmpeg 调用。
+
+    Args:
+        steps: 步骤列表，每个步骤为 {"function": 函数名, "params": 参数字典}，
+            支持 trim_video 和 resize_video，参数同对应函数
+
+    Returns:
+        处理结果（不包含文件路径），results 按步骤顺序排列
+    """
+    return _run_sync(_pipeline_async(steps))
+
+
+@_safe()
+async def _pipeline_async(
+    steps: list,
+    *,
+    output_prefix: str = ""
+) -> dict:
+    """
+    pipeline 的协程版本
+
+    参数与返回值同 pipeline；output_prefix 为输出文件名前缀。
+    """
+    if not steps or not isinstance(steps, list):
+        return {
+            "success": False,
+            "error": "steps 参数必须是非空列表",
+            "error_code": "INVALID_STEPS"
+        }
+
+    for i, step in enumerate(steps):
+        name = step.get("function") if isinstance(step, dict) else None
+        if name not in PIPELINE_STEPS:
             return {
                 "success": False,
-                "error": "times 参数必须是非空列表",
-                "error_code": "INVALID_TIMES"
+                "error": f"第 {i + 1} 步不支持的函数: {name}",
+                "error_code": "INVALID_FUNCTION"
             }
 
-        # 扫描输入
-        input_files = list(DATA_INPUTS.glob("*"))
-        if not input_files:
+        params = step.get("params", {})
+        hwaccel = params.get("hwaccel", "auto") if isinstance(params, dict) else "auto"
+        if hwaccel not in HWACCEL_MODES:
             return {
                 "success": False,
-                "error": "未找到输入视频文件",
-                "error_code": "NO_INPUT_FILE"
+                "error": f"第 {i + 1} 步不支持的硬件加速模式: {hwaccel}",
+                "error_code": "INVALID_HWACCEL"
             }
 
-        video_path = input_files[0]
-        video = VideoFileClip(str(video_path))
+    # 扫描输入
+    input_files = _list_inputs()
+    if not input_files:
+        return {
+            "success": False,
+            "error": "未找到输入视频文件",
+            "error_code": "NO_INPUT_FILE"
+        }
 
-        # 输出目录
-        DATA_OUTPUTS.mkdir(parents=True, exist_ok=True)
+    video_path = input_files[0]
+    infos = await asyncio.to_thread(_probe, video_path)
+
+    # 各步骤在同步的规划函数中选择编码器，先在线程中完成硬件编码器检测
+    if any(step.get("params", {}).get("hwaccel", "auto") == "auto" for step in steps):
+        await _hw_encoder_async("auto")
+
+    # 逐步推算每一步输出的时长和尺寸（中间结果在管道中，无法再读取文件头）
+    state = {"duration": infos["duration"], "video_size": infos["video_size"], "raw": False}
+    plans = []
+    for i, step in enumerate(steps):
+        plan_step, _ = PIPELINE_STEPS[step["function"]]
+        try:
+            result, input_args, output_args = plan_step(
+                state, i == len(steps) - 1, **step.get("params", {})
+            )
+        except TypeError as e:
+            return {
+                "success": False,
+                "error": f"第 {i + 1} 步参数错误: {e}",
+                "error_code": "INVALID_PARAMS"
+            }
 
-        # 提取每个时间点的帧
-        extracted_count = 0
-        for i, t in enumerate(times):
-            if t < 0 or t > video.duration:
-                continue
+        if not result["success"]:
+            return {**result, "error": f"第 {i + 1} 步: {result['error']}"}
+
+        plans.append((result, input_args, output_args))
+
+    # 输出文件名和格式由最后一步决定
+    _, output_name = PIPELINE_STEPS[steps[-1]["function"]]
+    output_path = _output_path(
+        output_name, steps[-1].get("params", {}).get("output_format", "mp4"), output_prefix
+    )
+
+    # FIFO 的另一端无法重放，不能失败后重试，启动前先确认输出目录存在
+    _ensure_output_dir()
+
+    commands = _fuse_steps([(input_args, output_args) for _, input_args, output_args in plans])
+
+    with tempfile.TemporaryDirectory() as fifo_dir:
+        fifos = [os.path.join(fifo_dir, f"step_{i + 1}.nut") for i in range(len(commands) - 1)]
+        for fifo in fifos:
+            os.mkfifo(fifo)
+
+        sources = [ffmpeg_escape_filename(os.fspath(video_path))] + fifos
+        with _atomic_outputs(output_path) as (part_path,):
+            sinks = [["-f", "nut", fifo] for fifo in fifos] + [[*FASTSTART_PARAMS, part_path]]
 
-            frame = video.get_frame(t)
-            output_path = DATA_OUTPUTS / f"frame_{i+1:03d}.{output_format}"
+            await _run_ffmpeg_chain([
+                [*input_args, "-i", source, *output_args, *sink]
+                for (input_args, output_args), source, sink in zip(commands, sources, sinks)
+            ])
 
-            img = ImageClip(frame)
-            img.save_frame(str(output_path))
-            img.close()
-            extracted_count += 1
+    # 只有剪辑步骤时可能是流复制，实际时长以输出文件为准（同 trim_video）
+    return {
+        "success": True,
+        "count": len(plans),
+        "duration": (await asyncio.to_thread(_probe, output_path))["duration"],
+        "width": state["video_size"][0],
+        "height": state["video_size"][1],
+        "results": [result for result, _, _ in plans]
+    }
 
-        video.close()
 
+@_safe()
+def process_batch(
+    jobs: list,
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    并发执行多个处理任务（v3.0 架构）
+
+    各任务的 ffmpeg 子进程同时运行，输出文件名以任务序号为前缀（如 001_trimmed.mp4）。
+
+    Args:
+        jobs: 任务列表，每个任务为 {"function": 函数名, "params": 参数字典}
+        max_concurrency: 最大并发任务数，默认为 CPU 核数的一半（libx264 自身也会多线程编码）
+
+    Returns:
+        批处理结果（不包含文件路径），results 按任务顺序排列
+    """
+    if not jobs or not isinstance(jobs, list):
         return {
-            "success": True,
-            "requested_count": len(times),
-            "extracted_count": extracted_count,
-            "format": output_format
+            "success": False,
+            "error": "jobs 参数必须是非空列表",
+            "error_code": "INVALID_JOBS"
         }
 
-    except Exception as e:
+    if max_concurrency is not None and (
+        isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1
+    ):
         return {
             "success": False,
-            "error": str(e),
-            "error_code": "PROCESSING_ERROR"
+            "error": f"max_concurrency 必须是正整数: {max_concurrency!r}",
+            "error_code": "INVALID_PARAMS"
         }
+
+    return _run_sync(_process_batch_async(jobs, max_concurrency))
+
+
+async def _process_batch_async(
+    jobs: list,
+    max_concurrency: Optional[int] = None
+) -> dict:
+    """
+    process_batch 的协程版本
+
+    参数与返回值同 process_batch。
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or max(1, (os.cpu_count() or 2) // 2))
+
+    async def run_job(index: int, job: dict) -> dict:
+        name = job.get("function") if isinstance(job, dict) else None
+        func = BATCH_FUNCTIONS.get(name)
+        if func is None:
+            return {
+                "success": False,
+                "error": f"不支持的函数: {name}",
+                "error_code": "INVALID_FUNCTION"
+            }
+
+        async with semaphore:
+            try:
+                return await func(**job.get("params", {}), output_prefix=f"{index + 1:03d}_")
+            except TypeError as e:
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "error_code": "INVALID_PARAMS"
+                }
+
+    results = await asyncio.gather(*(run_job(i, job) for i, job in enumerate(jobs)))
+
+    return {
+        "success": True,
+        "count": len(results),
+        "failed_count": sum(1 for result in results if not result["success"]),
+        "results": list(results)
+    }
+
+
+# process_batch 可调度的函数
+BATCH_FUNCTIONS = {
+    "video_to_audio": _video_to_audio_async,
+    "video_to_audio_batch": _video_to_audio_batch_async,
+    "concatenate_videos": _concatenate_videos_async,
+    "trim_video": _trim_video_async,
+    "trim_video_batch": _trim_video_batch_async,
+    "resize_video": _resize_video_async,
+    "extract_frames": _extract_frames_async,
+    "pipeline": _pipeline_async,
+}
@@ -13,24 +13,73 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.main import (
     video_to_audio,
+    video_to_audio_batch,
     concatenate_videos,
     trim_video,
+    trim_video_batch,
     resize_video,
-    extract_frames
+    extract_frames,
+    get_video_info,
+    pipeline,
+    process_batch
 )
 
 
+# 各函数在没有输入文件时的调用参数
+NO_INPUT_CASES = [
+    (video_to_audio, {"audio_format": "mp3"}),
+    (video_to_audio_batch, {"audio_formats": ["mp3", "wav"]}),
+    (trim_video, {"start_time": 0, "end_time": 10}),
+    (trim_video_batch, {"jobs": [{"start_time": 0, "end_time": 10}]}),
+    (resize_video, {"width": 640}),
+    (extract_frames, {"times": [1.0, 2.0]}),
+    (get_video_info, {}),
+    (pipeline, {"steps": [{"function": "trim_video", "params": {"start_time": 0}}]}),
+]
+
+
+@pytest.fixture
+def no_ffmpeg(tmp_path, monkeypatch):
+    """
+    输入、输出目录指向空的临时目录，并禁止启动子进程
+
+    用于只覆盖参数校验和缺少输入分支的测试，这些测试不应调用 ffmpeg；
+    校验顺序被改动导致意外启动 ffmpeg 时直接失败，而不是依赖当前目录的内容。
+    """
+    import asyncio
+    import subprocess
+    import src.main as main
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError(f"unexpected subprocess: {args[:2]}")
+
+    monkeypatch.setattr(main, "DATA_INPUTS", tmp_path / "inputs" / "input")
+    monkeypatch.setattr(main, "DATA_OUTPUTS", tmp_path / "outputs")
+    monkeypatch.setattr(subprocess, "run", forbidden)
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", forbidden)
+
+
+@pytest.mark.usefixtures("no_ffmpeg")
 class TestBasicFunctions:
     """测试基础功能（v3.0 架构）"""
 
-    def test_video_to_audio_no_input(self):
+    @pytest.mark.parametrize(
+        "func, kwargs", NO_INPUT_CASES, ids=[func.__name__ for func, _ in NO_INPUT_CASES]
+    )
+    def test_no_input(self, func, kwargs):
         """测试没有输入文件"""
         # v3.0: 不传文件参数，函数自动扫描
         # 由于没有创建输入文件，应该返回错误
-        result = video_to_audio(audio_format="mp3")
+        result = func(**kwargs)
         assert result["success"] is False
         assert result["error_code"] == "NO_INPUT_FILE"
 
+    def test_video_to_audio_batch_invalid_formats(self):
+        """测试格式列表无效"""
+        result = video_to_audio_batch(audio_formats=[])
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_FORMATS"
+
     def test_concatenate_videos_insufficient_files(self):
         """测试视频数量不足"""
         # v3.0: 函数自动扫描，需要至少2个文件
@@ -38,17 +87,29 @@ class TestBasicFunctions:
         assert result["success"] is False
         assert result["error_code"] in ["INSUFFICIENT_FILES", "NO_INPUT_FILE"]
 
-    def test_trim_video_no_input(self):
-        """测试剪辑视频无输入"""
-        result = trim_video(start_time=0, end_time=10)
+    @pytest.mark.parametrize("func, kwargs", [
+        (trim_video, {"start_time": 5, "end_time": 2}),
+        (video_to_audio, {"start_time": -1}),
+    ], ids=["trim_video", "video_to_audio"])
+    def test_invalid_time_range_before_input_scan(self, func, kwargs):
+        """测试时间参数在扫描输入之前校验"""
+        result = func(**kwargs)
         assert result["success"] is False
-        assert result["error_code"] == "NO_INPUT_FILE"
+        assert result["error_code"] == "INVALID_TIME_RANGE"
 
-    def test_resize_video_no_input(self):
-        """测试调整大小无输入"""
-        result = resize_video(width=640)
+    def test_pipeline_invalid_function_before_input_scan(self):
+        """测试 pipeline 步骤函数名在扫描输入之前校验"""
+        result = pipeline(steps=[{"function": "unknown"}])
         assert result["success"] is False
-        assert result["error_code"] == "NO_INPUT_FILE"
+        assert result["error_code"] == "INVALID_FUNCTION"
+
+    def test_pipeline_invalid_hwaccel(self):
+        """测试 pipeline 步骤中不支持的硬件加速模式"""
+        result = pipeline(steps=[
+            {"function": "trim_video", "params": {"start_time": 0, "hwaccel": "bogus"}}
+        ])
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_HWACCEL"
 
     def test_resize_video_missing_parameters(self):
         """测试缺少必需参数"""
@@ -56,18 +117,62 @@ class TestBasicFunctions:
         assert result["success"] is False
         assert result["error_code"] == "MISSING_PARAMETERS"
 
-    def test_extract_frames_no_input(self):
-        """测试提取帧无输入"""
-        result = extract_frames(times=[1.0, 2.0])
-        assert result["success"] is False
-        assert result["error_code"] == "NO_INPUT_FILE"
-
     def test_extract_frames_invalid_times(self):
         """测试无效的时间参数"""
         result = extract_frames(times=None)
         assert result["success"] is False
         assert result["error_code"] == "INVALID_TIMES"
 
+    def test_resize_video_invalid_hwaccel(self):
+        """测试不支持的硬件加速模式"""
+        result = resize_video(width=320, hwaccel="gpu")
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_HWACCEL"
+
+    def test_trim_video_batch_invalid_jobs(self):
+        """测试批量剪辑空片段列表"""
+        result = trim_video_batch(jobs=[])
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_JOBS"
+
+    def test_trim_video_batch_invalid_hwaccel(self):
+        """测试批量剪辑不支持的硬件加速模式"""
+        result = trim_video_batch(jobs=[{"start_time": 0}], hwaccel="gpu")
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_HWACCEL"
+
+    def test_pipeline_invalid_steps(self):
+        """测试 pipeline 空步骤"""
+        result = pipeline(steps=[])
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_STEPS"
+
+    def test_process_batch_invalid_jobs(self):
+        """测试无效的任务列表"""
+        result = process_batch(jobs=[])
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_JOBS"
+
+    @pytest.mark.parametrize("max_concurrency", [0, -1, "2", True])
+    def test_process_batch_invalid_max_concurrency(self, max_concurrency):
+        """测试无效的最大并发数"""
+        result = process_batch(
+            jobs=[{"function": "get_video_info"}], max_concurrency=max_concurrency
+        )
+        assert result["success"] is False
+        assert result["error_code"] == "INVALID_PARAMS"
+
+    def test_process_batch_reports_each_job(self):
+        """测试批处理逐个返回任务结果"""
+        result = process_batch(jobs=[
+            {"function": "trim_video", "params": {"start_time": 0, "end_time": 10}},
+            {"function": "unknown"}
+        ])
+        assert result["success"] is True
+        assert result["failed_count"] == 2
+        assert result["results"][0]["error_code"] == "NO_INPUT_FILE"
+        assert result["results"][1]["error_code"] == "INVALID_FUNCTION"
+
 
 class TestPathConventions:
     """测试路径约定"""
@@ -134,6 +239,7 @@ class TestFunctionSignatures:
         assert 'output_format' in sig.parameters
 
 
+@pytest.mark.usefixtures("no_ffmpeg")
 class TestReturnValues:
     """测试返回值（v3.0 架构）"""
 
@@ -151,3 +257,395 @@ class TestReturnValues:
         # 应该包含业务字段
         assert "success" in result
         assert "error_code" in result  # 因为失败了
+
+
+class TestFrameSeekTime:
+    """测试提帧跳转时间计算"""
+
+    def test_seek_lands_half_frame_before_target(self):
+        """跳转位置在目标帧之前半帧"""
+        from src.main import _frame_index, _frame_seek_time
+        assert _frame_seek_time(_frame_index(1.0, 30.0, 300), 30.0) == pytest.approx(29.5 / 30)
+
+    def test_seek_clamped_to_last_frame(self):
+        """超出最后一帧的时间点取最后一帧"""
+        from src.main import _frame_index, _frame_seek_time
+        assert _frame_index(10.0, 30.0, 300) == 299
+        assert _frame_seek_time(_frame_index(10.0, 30.0, 300), 30.0) == pytest.approx(298.5 / 30)
+
+    def test_seek_never_negative(self):
+        """第一帧的跳转时间不为负"""
+        from src.main import _frame_index, _frame_seek_time
+        assert _frame_seek_time(_frame_index(0.0, 30.0, 300), 30.0) == 0.0
+
+    def test_group_frames_merges_close_indices(self):
+        """相近的帧合并为一组，重复帧去重"""
+        from src.main import _group_frames
+        assert _group_frames([90, 3, 0, 3, 60, 5], 30) == [[0, 3, 5], [60, 90]]
+
+
+class TestProbeCache:
+    """测试媒体信息缓存"""
+
+    def test_cache_key_follows_file_changes(self, tmp_path, monkeypatch):
+        """文件内容变化后使用新的缓存键"""
+        import src.main as main
+
+        calls = []
+        monkeypatch.setattr(main, "_probe_cached", lambda *key: calls.append(key) or {})
+
+        media = tmp_path / "video.mp4"
+        media.write_bytes(b"a")
+        main._probe(media)
+        media.write_bytes(b"ab")
+        main._probe(media)
+
+        assert calls[0][0] == calls[1][0] == str(media)
+        assert calls[0] != calls[1]
+
+
+class TestListInputs:
+    """测试输入文件列表"""
+
+    def test_lists_files_only_and_refreshes(self, tmp_path, monkeypatch):
+        """只列出普通文件（跳过子目录和隐藏文件），每次调用都重新读取目录"""
+        import src.main as main
+
+        monkeypatch.setattr(main, "DATA_INPUTS", tmp_path)
+        (tmp_path / "a.mp4").write_bytes(b"a")
+        (tmp_path / ".hidden").write_bytes(b"h")
+        (tmp_path / "sub").mkdir()
+        assert [os.path.basename(p) for p in main._list_inputs()] == ["a.mp4"]
+
+        (tmp_path / "a.mp4").rename(tmp_path / "b.mp4")
+        assert [os.path.basename(p) for p in main._list_inputs()] == ["b.mp4"]
+
+    def test_missing_directory(self, tmp_path, monkeypatch):
+        """输入目录不存在时返回空列表"""
+        import src.main as main
+
+        monkeypatch.setattr(main, "DATA_INPUTS", tmp_path / "missing")
+        assert main._list_inputs() == ()
+
+
+class TestOutputDir:
+    """测试输出目录重建"""
+
+    def test_recreates_deleted_output_dir(self, tmp_path, monkeypatch):
+        """输出目录被删除后重新创建"""
+        import src.main as main
+
+        monkeypatch.setattr(main, "DATA_OUTPUTS", tmp_path / "outputs")
+        assert main._ensure_output_dir() is True
+        assert (tmp_path / "outputs").is_dir()
+        assert main._ensure_output_dir() is False
+
+    def test_atomic_outputs(self, tmp_path):
+        """成功时重命名为最终文件，失败时不留下残缺文件"""
+        import src.main as main
+
+        output_path = str(tmp_path / "out.mp4")
+        with main._atomic_outputs(output_path) as (part_path,):
+            assert os.path.basename(part_path).startswith(".")
+            Path(part_path).write_bytes(b"ok")
+        assert Path(output_path).read_bytes() == b"ok"
+        assert not os.path.exists(part_path)
+
+        failed_path = str(tmp_path / "failed.mp4")
+        with pytest.raises(RuntimeError):
+            with main._atomic_outputs(failed_path) as (part_path,):
+                Path(part_path).write_bytes(b"partial")
+                raise RuntimeError("ffmpeg failed")
+        assert os.listdir(tmp_path) == ["out.mp4"]
+
+
+class TestRunEncode:
+    """测试硬件解码与 CPU 回退"""
+
+    def test_hw_failure_falls_back_to_cpu_scale(self, monkeypatch):
+        """硬件解码失败时回退到 CPU 缩放"""
+        import asyncio
+        import src.main as main
+
+        calls = []
+
+        async def fake_run_ffmpeg(args):
+            calls.append(args)
+            if "-hwaccel" in args:
+                raise RuntimeError("hwaccel unavailable")
+
+        monkeypatch.setattr(main, "_has_filter", lambda name: True)
+        monkeypatch.setattr(main, "_run_ffmpeg", fake_run_ffmpeg)
+
+        asyncio.run(main._run_encode("h264_nvenc", [], "in.mp4", ["out.mp4"], size=(320, 180)))
+
+        assert calls[0][calls[0].index("-vf") + 1] == "scale_cuda=320:180"
+        assert "-hwaccel" not in calls[1]
+        assert calls[1][calls[1].index("-vf") + 1] == "scale=320:180:flags=bicubic"
+
+    def test_hw_encoders_set_quality_and_valid_preset(self, monkeypatch):
+        """硬件编码器使用固定质量码率控制，QSV 的 preset 映射到有效档位"""
+        import src.main as main
+
+        monkeypatch.setattr(main, "_hw_encoder", lambda: "h264_qsv")
+        codec, params = main._video_codec("ultrafast")
+        assert codec == "h264_qsv"
+        assert params[params.index("-preset") + 1] == "veryfast"
+        assert "-global_quality" in params
+
+        monkeypatch.setattr(main, "_hw_encoder", lambda: "h264_nvenc")
+        _, params = main._video_codec("faster")
+        assert params[params.index("-cq") + 1] == "23"
+
+    def test_x264_low_latency_and_fast_decode(self, monkeypatch):
+        """libx264 的低延迟参数与 tune 组合，hwaccel="none" 时不检测硬件编码器"""
+        import src.main as main
+
+        def no_detection():
+            raise AssertionError("hwaccel=none 时不应检测硬件编码器")
+
+        monkeypatch.setattr(main, "_hw_encoder", no_detection)
+
+        codec, params = main._video_codec("faster", hwaccel="none")
+        assert codec == "libx264"
+        assert params == ["-preset", "faster"]
+
+        _, params = main._video_codec("faster", low_latency=True, hwaccel="none")
+        assert params == [*main.X264_LOW_LATENCY_PARAMS, "-tune", "zerolatency"]
+
+        _, params = main._video_codec("faster", fast_decode=True, hwaccel="none")
+        assert params == ["-preset", "faster", "-tune", "fastdecode"]
+
+        _, params = main._video_codec("faster", low_latency=True, fast_decode=True, hwaccel="none")
+        assert params == [*main.X264_LOW_LATENCY_PARAMS, "-tune", "fastdecode,zerolatency"]
+
+        # downstream_decode 经 _trim_codec_args 映射为 fastdecode
+        _, args = main._trim_codec_args(True, "faster", False, True, "none")
+        assert args == ["-c:v", "libx264", "-preset", "faster", "-tune", "fastdecode", "-c:a", "aac"]
+
+    def test_scale_flags(self):
+        """缩小用 area，放大用 bicubic"""
+        from src.main import _scale_flags
+        assert _scale_flags((1280, 720), (640, 360)) == "area"
+        assert _scale_flags((640, 360), (1280, 720)) == "bicubic"
+
+
+class TestPipelineFusion:
+    """测试 pipeline 相邻步骤合并"""
+
+    def test_trim_fuses_into_following_resize(self):
+        """剪辑后接调整尺寸合并为一个进程，剪辑后接剪辑不合并"""
+        import src.main as main
+
+        raw = main.INTERMEDIATE_CODEC_PARAMS
+        trim = (["-ss", "1"], ["-t", "2", *raw])
+        resize = ([], ["-vf", "scale=640:360:flags=area", "-c:v", "libx264"])
+
+        assert main._fuse_steps([trim, resize]) == [
+            (["-ss", "1"], ["-t", "2", "-vf", "scale=640:360:flags=area", "-c:v", "libx264"])
+        ]
+        assert main._fuse_steps([trim, trim]) == [trim, trim]
+        assert main._fuse_steps([(resize[0], ["-vf", "scale=1:1", *raw]), resize]) == [
+            ([], ["-vf", "scale=1:1", *raw]), resize
+        ]
+
+
+@pytest.fixture(scope="session")
+def synthetic_video(tmp_path_factory):
+    """
+    用 ffmpeg 的 lavfi 测试源生成一段 2 秒、320x180@30fps、带正弦音频的小视频
+
+    整个测试会话只生成一次；ffmpeg 不可用时跳过依赖它的测试。
+    """
+    import subprocess
+    from moviepy.config import FFMPEG_BINARY
+
+    path = tmp_path_factory.mktemp("synthetic") / "testsrc.mp4"
+    try:
+        subprocess.run([
+            FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=duration=2:size=320x180:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=2",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", "30", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest", str(path)
+        ], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        pytest.skip(f"ffmpeg 不可用: {e}")
+    return path
+
+
+class TestSyntheticVideo:
+    """使用合成视频的端到端测试"""
+
+    @pytest.fixture(autouse=True)
+    def video_dirs(self, synthetic_video, tmp_path, monkeypatch):
+        """把合成视频放入临时输入目录，输出写入临时目录"""
+        import src.main as main
+
+        input_dir = tmp_path / "inputs" / "input"
+        input_dir.mkdir(parents=True)
+        (input_dir / synthetic_video.name).symlink_to(synthetic_video)
+        monkeypatch.setattr(main, "DATA_INPUTS", input_dir)
+        monkeypatch.setattr(main, "DATA_OUTPUTS", tmp_path / "outputs")
+        (tmp_path / "outputs").mkdir()
+        return tmp_path / "outputs"
+
+    def test_get_video_info(self):
+        """读取合成视频的基本信息"""
+        result = get_video_info()
+        assert result["success"] is True
+        assert (result["width"], result["height"], result["fps"]) == (320, 180, 30.0)
+        assert result["has_audio"] is True
+
+    def test_trim_and_resize(self, video_dirs):
+        """剪辑和调整尺寸的输出时长、尺寸正确"""
+        from src.main import _probe
+
+        result = trim_video(start_time=0.5, end_time=1.5)
+        assert result["success"] is True
+        assert result["duration"] == _probe(video_dirs / "trimmed.mp4")["duration"]
+        assert abs(result["duration"] - 1.0) < 0.1
+
+        assert resize_video(width=160)["success"] is True
+        assert _probe(video_dirs / "resized.mp4")["video_size"] == [160, 90]
+
+    def test_video_to_audio(self, video_dirs):
+        """导出音频"""
+        result = video_to_audio(audio_format="wav")
+        assert result["success"] is True
+        assert (video_dirs / "audio.wav").stat().st_size > 0
+
+    def test_video_to_audio_segment(self, video_dirs):
+        """只导出指定区间的音频"""
+        from src.main import _probe
+
+        result = video_to_audio(audio_format="wav", start_time=0.5, end_time=1.5)
+        assert result["success"] is True
+        assert result["duration"] == 1.0
+        assert abs(_probe(video_dirs / "audio.wav")["duration"] - 1.0) < 0.05
+
+    @pytest.mark.parametrize("steps, duration, size", [
+        # 剪辑后接调整尺寸：合并为一个 ffmpeg 进程
+        ([("trim_video", {"start_time": 0.5, "end_time": 1.5}), ("resize_video", {"width": 160})],
+         1.0, [160, 90]),
+        # 调整尺寸后接剪辑：两个进程经 FIFO 传递原始帧
+        ([("resize_video", {"width": 160}), ("trim_video", {"start_time": 0.5, "end_time": 1.0})],
+         0.5, [160, 90]),
+        # 剪辑后接剪辑：下游提前结束，上游写管道收到 Broken pipe 不视为失败
+        ([("trim_video", {"start_time": 0.2}), ("trim_video", {"start_time": 0.3, "end_time": 0.8})],
+         0.5, [320, 180]),
+    ], ids=["trim_resize", "resize_trim", "trim_trim"])
+    def test_pipeline(self, video_dirs, steps, duration, size):
+        """pipeline 各种步骤组合的输出时长和尺寸正确"""
+        from src.main import _probe
+
+        result = pipeline(steps=[
+            {"function": name, "params": params} for name, params in steps
+        ])
+        assert result["success"] is True
+        assert result["count"] == len(steps)
+
+        output_name = "resized.mp4" if steps[-1][0] == "resize_video" else "trimmed.mp4"
+        infos = _probe(video_dirs / output_name)
+        assert result["duration"] == infos["duration"]
+        assert abs(infos["duration"] - duration) < 0.1
+        assert infos["video_size"] == size
+
+    def test_extract_frames(self, video_dirs):
+        """按请求顺序命名输出帧，重复时间点复制同一帧，超出范围的时间点跳过"""
+        result = extract_frames(times=[1.0, 0.1, 1.0, 5.0, -1.0, 1.9])
+        assert result["success"] is True
+        assert result["requested_count"] == 6
+        assert result["extracted_count"] == 4
+
+        names = sorted(path.name for path in video_dirs.iterdir())
+        assert names == ["frame_001.jpg", "frame_002.jpg", "frame_003.jpg", "frame_006.jpg"]
+        assert (video_dirs / "frame_001.jpg").read_bytes() == (video_dirs / "frame_003.jpg").read_bytes()
+        assert (video_dirs / "frame_001.jpg").read_bytes() != (video_dirs / "frame_002.jpg").read_bytes()
+
+    def test_extract_frames_past_video_end(self, synthetic_video, video_dirs):
+        """音频比视频长时，视频结尾之后的时间点取视频最后一帧"""
+        import subprocess
+        import src.main as main
+        from moviepy.config import FFMPEG_BINARY
+
+        # 1 秒视频 + 2 秒音频，不加 -shortest，容器时长以音频为准
+        path = main.DATA_INPUTS / synthetic_video.name
+        path.unlink()
+        subprocess.run([
+            FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=duration=1:size=320x180:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=2",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", str(path)
+        ], check=True, capture_output=True)
+
+        result = extract_frames(times=[0.99, 1.5, 1.9, 0.1])
+        assert result["success"] is True
+        assert result["extracted_count"] == 4
+
+        names = sorted(path.name for path in video_dirs.iterdir())
+        assert names == ["frame_001.jpg", "frame_002.jpg", "frame_003.jpg", "frame_004.jpg"]
+        last = (video_dirs / "frame_001.jpg").read_bytes()
+        assert (video_dirs / "frame_002.jpg").read_bytes() == last
+        assert (video_dirs / "frame_003.jpg").read_bytes() == last
+        assert (video_dirs / "frame_004.jpg").read_bytes() != last
+
+    def test_trim_video_batch(self, video_dirs):
+        """一次剪辑出多个片段，无效片段单独报错且不影响其他片段"""
+        from src.main import _probe
+
+        result = trim_video_batch(jobs=[
+            {"start_time": 0, "end_time": 0.5},
+            {"start_time": 0.5, "end_time": "2"},
+            {"start_time": 1.0},
+            {"start_time": 5.0},
+        ])
+        assert result["success"] is True
+        assert result["count"] == 4
+        assert result["failed_count"] == 2
+        assert [r.get("error_code") for r in result["results"]] == [
+            None, "INVALID_PARAMS", None, "INVALID_TIME_RANGE"
+        ]
+
+        assert sorted(path.name for path in video_dirs.iterdir()) == [
+            "trimmed_001.mp4", "trimmed_003.mp4"
+        ]
+        assert abs(_probe(video_dirs / "trimmed_001.mp4")["duration"] - 0.5) < 0.1
+        assert abs(_probe(video_dirs / "trimmed_003.mp4")["duration"] - 1.0) < 0.1
+        assert result["results"][0]["duration"] == _probe(video_dirs / "trimmed_001.mp4")["duration"]
+        assert result["results"][2]["duration"] == _probe(video_dirs / "trimmed_003.mp4")["duration"]
+
+    def test_video_to_audio_batch(self, video_dirs):
+        """一次导出多种格式并去重；任一格式失败时不写出任何文件"""
+        from src.main import _probe
+
+        result = video_to_audio_batch(audio_formats=["mp3", "wav", "mp3", "aac"])
+        assert result["success"] is True
+        assert result["count"] == 3
+        assert result["formats"] == ["mp3", "wav", "aac"]
+        assert sorted(os.listdir(video_dirs)) == ["audio.aac", "audio.mp3", "audio.wav"]
+        assert abs(_probe(video_dirs / "audio.wav")["duration"] - 2.0) < 0.1
+
+        result = video_to_audio_batch(audio_formats=["flac", "notaformat"])
+        assert result["success"] is False
+        assert sorted(os.listdir(video_dirs)) == ["audio.aac", "audio.mp3", "audio.wav"]
+
+    @pytest.mark.parametrize("stream_copy, cpu_count", [
+        (True, 1),    # 编码参数一致：concat demuxer 流复制
+        (False, 1),   # 单核：一次 ffmpeg 调用，filter_complex 拼接
+        (False, 8),   # 多核：各片段并行转码后流复制拼接
+    ], ids=["stream_copy", "filter_complex", "parallel"])
+    def test_concatenate_videos(self, synthetic_video, video_dirs, monkeypatch, stream_copy, cpu_count):
+        """拼接两段视频的输出时长正确，且不留下临时文件"""
+        import src.main as main
+
+        (main.DATA_INPUTS / "second.mp4").symlink_to(synthetic_video)
+        monkeypatch.setattr(os, "cpu_count", lambda: cpu_count)
+
+        result = concatenate_videos(stream_copy=stream_copy, hwaccel="none")
+        assert result["success"] is True
+        assert result["count"] == 2
+        assert result["stream_copy"] is stream_copy
+        assert os.listdir(video_dirs) == ["concatenated.mp4"]
+        assert abs(main._probe(video_dirs / "concatenated.mp4")["duration"] - 4.0) < 0.15